@@ -1,43 +1,103 @@
 import pandas as pd
+import numpy as np
 import io
 
+SHEET_NAME = '5 YEARS_Annual Profit and Loss'
+HEADER_SCAN_ROWS = 20 # Rows checked first when looking for the header
+
+# Standard expense categories offered for manual entry
+TEMPLATE_CATEGORIES = (
+    "Gross Sales",
+    "Less Sales Discounts (enter as negative)",
+    "Less Sales Returns (enter as negative)",
+    "Cost of Goods Sold",
+    "Marketing & Advertising",
+    "Salaries & Wages",
+    "Payroll Benefits & Taxes",
+    "Travel & Entertainment",
+    "Web Hosting and maintenance",
+    "Stationary",
+    "Rent",
+    "Utilities",
+    "Office Supplies",
+    "Professional Fees",
+    "Insurance",
+    "Depreciation",
+    "Interest Expense",
+    "Other Operating Expenses1",
+    "Other Operating Expenses2",
+    "Other Operating Expenses3",
+    "Other Operating Expenses4",
+    "Other Operating Expenses5",
+)
+
+def _load_sheet(file_or_path):
+    """
+    Reads the P&L sheet without a header.
+    Uses the calamine engine when installed, otherwise streams the rows with
+    openpyxl in read-only mode (no styles/formatting, cached formula values).
+    """
+    try:
+        with pd.ExcelFile(file_or_path, engine="calamine") as xl:
+            return xl.parse(SHEET_NAME, header=None)
+    except ImportError:
+        import openpyxl
+        wb = openpyxl.load_workbook(file_or_path, read_only=True, data_only=True)
+        try:
+            return pd.DataFrame(wb[SHEET_NAME].values)
+        finally:
+            wb.close()
+
+def _first_matching_row(cells, keywords):
+    """
+    Returns the position of the first row of the lower-cased string matrix `cells`
+    containing any of the keywords, or -1. Matches the whole matrix with numpy.char
+    instead of building a Series per row.
+    """
+    hits = np.zeros(cells.shape[0], dtype=bool)
+    for keyword in keywords:
+        hits |= (np.char.find(cells, keyword) >= 0).any(axis=1)
+    if not hits.any():
+        return -1
+    return int(hits.argmax())
+
 def clean_and_parse_data(file_or_path):
     """
     Reads the Excel file and extracts P&L data.
     Attempts to intelligently find the header row containing Years and 'Category'.
     """
     try:
-        # Load the dataframe without header initially to scan
-        if isinstance(file_or_path, str):
-            df_raw = pd.read_excel(file_or_path, sheet_name='5 YEARS_Annual Profit and Loss', header=None)
-        else:
-            df_raw = pd.read_excel(file_or_path, sheet_name='5 YEARS_Annual Profit and Loss', header=None)
+        # Load the dataframe once without header; the header row is sliced out below
+        # (works the same for a path or an uploaded file buffer)
+        df_raw = _load_sheet(file_or_path)
+
+        # Cells as lower-case text, shared by both header strategies.
+        # The header is normally near the top, so only the first rows are
+        # converted unless Strategy 1 has to look further down.
+        cells = np.char.lower(df_raw.iloc[:HEADER_SCAN_ROWS].to_numpy().astype(str))
 
         # Strategy 1: Look for "Category" or "Account" explicitly
-        header_row_idx = -1
-        for idx, row in df_raw.iterrows():
-            row_str = row.astype(str).str.lower()
-            if row_str.str.contains("category").any() or row_str.str.contains("account").any():
-                header_row_idx = idx
-                break
+        header_row_idx = _first_matching_row(cells, ["category", "account"])
+        if header_row_idx == -1 and len(df_raw) > HEADER_SCAN_ROWS:
+            cells = np.char.lower(df_raw.to_numpy().astype(str))
+            header_row_idx = _first_matching_row(cells, ["category", "account"])
         
         # Strategy 2: If not found, look for "Gross Sales" (Data row) and take row above it
         if header_row_idx == -1:
-            for idx, row in df_raw.iterrows():
-                if row.astype(str).str.contains("Gross Sales", case=False, na=False).any():
-                    # If Gross Sales is found, the header is likely the row above
-                    if idx > 0:
-                        header_row_idx = idx - 1
-                    else:
-                        header_row_idx = idx # Fallback, though unlikely
-                    break
+            idx = _first_matching_row(cells, ["gross sales"])
+            if idx != -1:
+                # If Gross Sales is found, the header is likely the row above
+                if idx > 0:
+                    header_row_idx = idx - 1
+                else:
+                    header_row_idx = idx # Fallback, though unlikely
 
         if header_row_idx == -1:
             return None, "Could not identify header row (checked for 'Category', 'Account', or row above 'Gross Sales')."
 
         # Apply Header
         new_header = df_raw.iloc[header_row_idx]
-        df = df_raw[header_row_idx + 1:].copy() 
+        df = df_raw.iloc[header_row_idx + 1:].copy()
         df.columns = new_header
         
         # Rename first column to 'Category' to be safe
@@ -56,53 +116,27 @@ def clean_and_parse_data(file_or_path):
         
         # Clean up Year Columns (convert float to int/str)
         # Some imports make 2024 as 2024.0
-        new_cols = []
-        for c in df.columns:
-            try:
-                # If it's a number like 2024.0, make it '2024'
-                val = float(c)
-                if val.is_integer() and val > 1900 and val < 2100:
-                    new_cols.append(str(int(val)))
-                else:
-                     new_cols.append(str(c).strip())
-            except:
-                new_cols.append(str(c).strip())
-        df.columns = new_cols
+        # If it's a number like 2024.0, make it '2024' (whole column index in one pass)
+        cols = pd.Index(df.columns, dtype=object).map(str).str.strip()
+        num = pd.to_numeric(cols, errors='coerce')
+        is_year = (num > 1900) & (num < 2100) & (num % 1 == 0)
+        df.columns = cols.where(~is_year, num.where(is_year, 0).astype(int).astype(str))
 
         df.reset_index(drop=True, inplace=True)
+
+        # Switch to Arrow-backed dtypes once, so later renames/slices/exports
+        # don't copy object arrays. Amounts stay floats (no int downcast).
+        try:
+            df = df.convert_dtypes(dtype_backend="pyarrow", convert_integer=False)
+        except ImportError:
+            pass # pyarrow not installed: keep the NumPy dtypes
         
         return df, None
 
     except Exception as e:
         return None, f"Parsing Error: {str(e)}"
 
-    except Exception as e:
-        return None, str(e)
-
 def get_empty_template():
     """Returns a DataFrame with the standard expense categories for manual entry."""
-    categories = [
-        "Gross Sales",
-        "Less Sales Discounts (enter as negative)",
-        "Less Sales Returns (enter as negative)",
-        "Cost of Goods Sold",
-        "Marketing & Advertising",
-        "Salaries & Wages",
-        "Payroll Benefits & Taxes",
-        "Travel & Entertainment",
-        "Web Hosting and maintenance",
-        "Stationary",
-        "Rent",
-        "Utilities",
-        "Office Supplies",
-        "Professional Fees",
-        "Insurance",
-        "Depreciation",
-        "Interest Expense",
-        "Other Operating Expenses1",
-        "Other Operating Expenses2",
-        "Other Operating Expenses3",
-        "Other Operating Expenses4",
-        "Other Operating Expenses5"
-    ]
-    return pd.DataFrame({"Category": categories, "2024": [0.0]*len(categories), "2025": [0.0]*len(categories)})
+    n = len(TEMPLATE_CATEGORIES)
+    return pd.DataFrame({"Category": list(TEMPLATE_CATEGORIES), "2024": np.zeros(n), "2025": np.zeros(n)})
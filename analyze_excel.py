@@ -15,18 +15,16 @@ def analyze_file(file_path):
     print(f"\nAnalyzing file: {file_path}")
     try:
         # Load without header
-        df = pd.read_excel(full_path, sheet_name='5 YEARS_Annual Profit and Loss', header=None)
+        with pd.ExcelFile(full_path, engine="calamine") as xl:
+            df = xl.parse('5 YEARS_Annual Profit and Loss', header=None)
         
         # Find first row with at least 3 non-null values
-        start_row = -1
-        for idx, row in df.iterrows():
-            if row.count() >= 3:
-                start_row = idx
-                break
+        has_data = df.notna().sum(axis=1) >= 3
+        start_row = int(has_data.idxmax()) if has_data.any() else -1
         
         if start_row != -1:
             print(f"Potential header found at row {start_row}")
-            print(df.iloc[start_row:start_row+5].to_markdown())
+            print(df.iloc[start_row:start_row+5].to_string())
         else:
             print("No significant data found.")
             
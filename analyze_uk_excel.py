@@ -9,26 +9,33 @@ print(f"Analyzing file: {full_path}")
 try:
     # Read the excel file, skipping potential header rows to find the main table
     # Based on previous analysis of the other file, data might start around row 5-6
-    df = pd.read_excel(full_path, sheet_name='5 YEARS_Annual Profit and Loss', header=None)
+    with pd.ExcelFile(full_path, engine="calamine") as xl:
+        df = xl.parse('5 YEARS_Annual Profit and Loss', header=None)
     
     # Locate the row with "Gross Sales" to define the header structure
-    header_row_idx = -1
-    for idx, row in df.iterrows():
-        # Check first few columns for "Gross Sales"
-        if row.astype(str).str.contains("Gross Sales", case=False, na=False).any():
-            header_row_idx = idx
-            break
+    # Check every cell at once for "Gross Sales"
+    hits = df.astype(str).apply(lambda col: col.str.contains("Gross Sales", case=False, na=False)).any(axis=1)
+    header_row_idx = int(hits.idxmax()) if hits.any() else -1
             
     if (header_row_idx != -1):
         print(f"Header likely at row: {header_row_idx}")
-        # Reload with header
-        df = pd.read_excel(full_path, sheet_name='5 YEARS_Annual Profit and Loss', header=header_row_idx)
-        print(df.head(20).to_markdown())
+        # Promote that row to the header in place instead of re-reading the file
+        header = df.iloc[header_row_idx]
+        df = df.iloc[header_row_idx + 1:].reset_index(drop=True)
+        # Label cells the way read_excel(header=N) does: whole-number floats as
+        # plain ints, empty cells as "Unnamed: i"
+        df.columns = [
+            f"Unnamed: {i}" if pd.isna(c)
+            else int(c) if isinstance(c, float) and c.is_integer()
+            else c
+            for i, c in enumerate(header.tolist())
+        ]
+        print(df.head(20).to_string())
         print("\n--- Column Names ---")
         print(df.columns.tolist())
     else:
         print("Could not locate 'Gross Sales' row. Printing first 20 rows raw.")
-        print(df.head(20).to_markdown())
+        print(df.head(20).to_string())
 
 except Exception as e:
     print(f"Error reading file: {e}")
@@ -1,11 +1,17 @@
 import streamlit as st
 import pandas as pd
-import json
+import numpy as np
 import os
+import io
+try:
+    import orjson
+except ImportError:
+    orjson = None # stdlib json fallback in dump_json/load_json
+    import json
 from analyze_data import clean_and_parse_data, get_empty_template
-from forecasting import generate_forecast, calculate_summary_metrics, calculate_executive_summary
+from forecasting import generate_forecast, compute_all_summaries
 import plotly.graph_objects as go
-import plotly.express as px
+from langchain_core.messages import HumanMessage, SystemMessage
 import nest_asyncio
 import importlib
 import analyze_data
@@ -14,7 +20,7 @@ importlib.reload(analyze_data)
 importlib.reload(forecasting)
 
 from analyze_data import clean_and_parse_data, get_empty_template
-from forecasting import generate_forecast, calculate_summary_metrics, calculate_executive_summary
+from forecasting import generate_forecast, compute_all_summaries
 
 nest_asyncio.apply()
 
@@ -30,32 +36,176 @@ if 'chat_history' not in st.session_state:
 if 'manual_data' not in st.session_state:
     st.session_state.manual_data = get_empty_template()
 
+# --- Cached Computation ---
+# Streamlit reruns this whole script on every widget interaction, so the
+# expensive parse/forecast steps are cached and keyed on their inputs.
+@st.cache_data(show_spinner=False)
+def parse_uploaded_file(file_bytes):
+    return clean_and_parse_data(io.BytesIO(file_bytes))
+
+@st.cache_data(show_spinner=False)
+def build_forecast(data_source, start_year, end_year):
+    forecast_df = generate_forecast(data_source, start_year, end_year)
+    summary_df, exec_summary_df = compute_all_summaries(forecast_df)
+    return forecast_df, summary_df, exec_summary_df
+
+@st.cache_data(show_spinner=False)
+def forecast_context(forecast_df):
+    # Markdown table sent to the LLM; only rebuilt when the forecast changes.
+    return forecast_df.to_markdown()
+
+# Figures are cached as resources: for unchanged inputs the same figure object
+# is handed back on reruns, skipping figure construction entirely.
+@st.cache_resource(show_spinner=False)
+def build_trend_chart(summary_df):
+    # One stacked area trace per metric, fed straight from the summary columns
+    # (no long-format melt needed)
+    years = summary_df.index.to_numpy()
+    colors = {"Gross Profit": "#2ecc71", "Total Expenses": "#e74c3c", "Net Profit": "#3498db"}
+    
+    fig = go.Figure()
+    for metric, color in colors.items():
+        fig.add_trace(go.Scatter(
+            x=years, y=summary_df[metric].to_numpy(dtype=float),
+            name=metric, mode="lines", line={"color": color}, stackgroup="1",
+            hovertemplate=f"Metric={metric}<br>Year=%{{x}}<br>Amount=%{{y}}<extra></extra>",
+        ))
+    fig.update_layout(xaxis_title="Year", yaxis_title="Amount", legend_title_text="Metric")
+    return fig
+
+@st.cache_resource(show_spinner=False)
+def build_expense_pie(forecast_df, last_year):
+    """Returns the expense donut for last_year, or None if there are no expense rows."""
+    # Extract expense rows from original DF for the last year
+    # Filter for explicit expense categories
+    expense_keys = ["Marketing", "Salaries", "Rent", "Utilities", "Office", "Professional", "Insurance", "Interest", "Taxes"]
+    
+    if 'Category' not in forecast_df.columns or last_year not in forecast_df.columns:
+        return None
+    
+    # Select the slices with one scan over the categories
+    categories = forecast_df['Category'].astype(str)
+    amounts = pd.to_numeric(forecast_df[last_year], errors='coerce')
+    mask = categories.str.contains("|".join(expense_keys), case=False, na=False) & (amounts > 0)
+    
+    if not mask.any():
+        return None
+    fig_pie = go.Figure(go.Pie(
+        labels=categories[mask].to_numpy(), values=amounts[mask].to_numpy(), hole=0.4,
+        textposition='inside', textinfo='percent+label',
+        hovertemplate="Category=%{label}<br>Amount=%{value}<extra></extra>",
+    ))
+    return fig_pie
+
+@st.cache_resource(show_spinner=False)
+def get_llm(provider, api_key, model):
+    """
+    Returns a chat model client for the provider, reused across chat turns.
+    The provider's LangChain package is only imported when it is first used.
+    """
+    if provider == "OpenAI":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model=model, api_key=api_key)
+    elif provider == "Local (Ollama)":
+        from langchain_ollama import ChatOllama
+        return ChatOllama(model=model)
+    elif provider == "Google Gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        # Using standard model name. Ensure langchain-google-genai is updated.
+        return ChatGoogleGenerativeAI(model=model, google_api_key=api_key)
+    elif provider == "OpenRouter":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=api_key,
+            model=model,
+            default_headers={
+                "HTTP-Referer": "http://localhost:8501", 
+                "X-Title": "Financial Chatbot POC"
+            }
+        )
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+@st.cache_resource(show_spinner=False)
+def build_waterfall_chart(exec_summary_df, year):
+    # Profit flow for one year: Sales -> COGS -> Gross Margin -> Opex -> Interest/Tax -> Net
+    # All inputs for the year in one lookup
+    val_sales, cogs, opex, interest, taxes = exec_summary_df.loc[
+        ["Net Sales", "Direct Cost", "Operating Expenses", "Interest", "Taxes"], year
+    ].to_numpy(dtype=float)
+    val_cogs = -abs(cogs) # COGS is a reduction
+    val_opex = -abs(opex)
+    val_tax_int = -abs(interest + taxes)
+    
+    # Bar labels in thousands; the two totals are the running sums
+    gross_margin = val_sales + val_cogs
+    bar_values = np.array([val_sales, val_cogs, gross_margin, val_opex, val_tax_int, gross_margin + val_opex + val_tax_int])
+    bar_text = np.char.add(np.char.mod("%.1f", bar_values / 1000), "k")
+    
+    fig_waterfall = go.Figure(go.Waterfall(
+        orientation = "v",
+        measure = ["absolute", "relative", "total", "relative", "relative", "total"],
+        x = ["Net Sales", "Direct Cost", "Gross Margin", "Opex", "Interest/Tax", "Net Result"],
+        textposition = "outside",
+        text = bar_text.tolist(),
+        y = [val_sales, val_cogs, 0, val_opex, val_tax_int, 0],
+        connector = {"line":{"color":"rgb(63, 63, 63)"}},
+    ))
+    
+    fig_waterfall.update_layout(title = "Profit Flow Waterfall", showlegend = True)
+    return fig_waterfall
+
 # --- Saving/Loading Persistence ---
 SESSION_FILE = "session_data.json"
-DATA_FILE = "session_data.csv"
+DATA_FILE = "session_data.parquet"
+CSV_DATA_FILE = "session_data.csv" # Fallback / older sessions
+
+def dump_json(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+def load_json(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
 
 def save_session():
     data_to_save = {
         "chat_history": st.session_state.chat_history
     }
-    with open(SESSION_FILE, 'w') as f:
-        json.dump(data_to_save, f)
+    # Write to a temp file and swap it in, so a failed save never leaves a truncated session
+    tmp_file = SESSION_FILE + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(dump_json(data_to_save))
+    os.replace(tmp_file, SESSION_FILE)
     
     # Save Dataframe if exists
+    # Parquet keeps the column types, so reloading skips CSV text parsing.
+    # Columns pyarrow can't encode (e.g. mixed text/numbers) fall back to CSV.
     if st.session_state.data_source is not None:
-        st.session_state.data_source.to_csv(DATA_FILE, index=False)
+        try:
+            st.session_state.data_source.to_parquet(DATA_FILE, index=False, compression="zstd")
+        except (ImportError, ValueError, TypeError):
+            st.session_state.data_source.to_csv(CSV_DATA_FILE, index=False)
+            # Don't let an older parquet file shadow the fresh CSV on load
+            if os.path.exists(DATA_FILE):
+                os.remove(DATA_FILE)
         
     st.toast("Session & Data Saved Successfully!")
 
 def load_session():
     if os.path.exists(SESSION_FILE):
-        with open(SESSION_FILE, 'r') as f:
-            data = json.load(f)
+        with open(SESSION_FILE, 'rb') as f:
+            data = load_json(f.read())
             st.session_state.chat_history = data.get("chat_history", [])
     
-    if os.path.exists(DATA_FILE):
+    if os.path.exists(DATA_FILE) or os.path.exists(CSV_DATA_FILE):
         try:
-            st.session_state.data_source = pd.read_csv(DATA_FILE)
+            if os.path.exists(DATA_FILE):
+                st.session_state.data_source = pd.read_parquet(DATA_FILE)
+            else:
+                st.session_state.data_source = pd.read_csv(CSV_DATA_FILE)
             st.toast("Session & Data Loaded!")
         except Exception as e:
             st.error(f"Error loading data: {e}")
@@ -103,7 +253,8 @@ with st.sidebar:
                     pass
         
         api_key = st.text_input("Enter API Key", type="password", value=default_key)
-        os.environ["OPENAI_API_KEY"] = api_key
+        if api_key:
+            os.environ["OPENAI_API_KEY"] = api_key
         
         # Model selection for OpenAI
         openai_model_options = ["gpt-4o", "gpt-4-turbo", "gpt-3.5-turbo"]
@@ -172,7 +323,7 @@ with tab1:
     if input_method == "Excel Upload":
         uploaded_file = st.file_uploader("Upload Profit & Loss Excel", type=["xlsx", "xls"])
         if uploaded_file:
-            df, error = clean_and_parse_data(uploaded_file)
+            df, error = parse_uploaded_file(uploaded_file.getvalue())
             if error:
                 st.error(f"Error parsing file: {error}")
             else:
@@ -192,9 +343,8 @@ with tab1:
             st.success("Data loaded for processing!")
 
 # --- Shared Logic: Ensure Data Exists ---
-from forecasting import generate_forecast, calculate_summary_metrics, calculate_executive_summary
+from forecasting import generate_forecast, compute_all_summaries
 import plotly.graph_objects as go
-import plotly.express as px
 
 # ... (rest of imports)
 
@@ -211,9 +361,7 @@ if st.session_state.data_source is not None:
              st.error("CRITICAL: 'Category' column missing!")
 
     # Generate Forecast automatically
-    forecast_df = generate_forecast(st.session_state.data_source, start_year, end_year)
-    summary_df = calculate_summary_metrics(forecast_df)
-    exec_summary_df = calculate_executive_summary(forecast_df)
+    forecast_df, summary_df, exec_summary_df = build_forecast(st.session_state.data_source, start_year, end_year)
     
     # --- Tab 2: Analysis ---
     with tab2:
@@ -224,12 +372,12 @@ if st.session_state.data_source is not None:
         st.markdown("Detailed breakdown of Revenue, Expenses, and Profitability.")
         
         # Formatting for display
-        display_df = exec_summary_df.copy()
-        # Format numbers as currency string for display if desired, or let Streamlit handle it
-        # Let's use Streamlit's column config for better interactivity
+        # Let's use Streamlit's column config for better interactivity:
+        # numbers are formatted in the browser grid, no pandas Styler pass
         st.dataframe(
-            display_df.style.format("{:,.2f}"),
-            use_container_width=True
+            exec_summary_df,
+            use_container_width=True,
+            column_config={y: st.column_config.NumberColumn(format="%,.2f") for y in exec_summary_df.columns}
         )
 
         st.divider()
@@ -243,13 +391,7 @@ if st.session_state.data_source is not None:
             # Net Sales vs Total Expenses vs Net Profit
             st.caption("📈 **5-Year Financial Trend**")
             
-            # Prepare data for Plotly Express
-            trend_data = summary_df.reset_index().rename(columns={"index": "Year"})
-            # Melt for multiple lines
-            trend_melt = trend_data.melt(id_vars=["Year"], value_vars=["Gross Profit", "Total Expenses", "Net Profit"], var_name="Metric", value_name="Amount")
-            
-            fig_trend = px.area(trend_melt, x="Year", y="Amount", color="Metric", 
-                                color_discrete_map={"Gross Profit": "#2ecc71", "Total Expenses": "#e74c3c", "Net Profit": "#3498db"})
+            fig_trend = build_trend_chart(summary_df)
             st.plotly_chart(fig_trend, use_container_width=True)
             
         with col_charts_2:
@@ -258,24 +400,8 @@ if st.session_state.data_source is not None:
              last_year = str(end_year)
              st.caption(f"🍩 **Expense Breakdown ({last_year})**")
              
-             # Extract expense rows from original DF for the last year
-             # Filter for explicit expense categories
-             expense_keys = ["Marketing", "Salaries", "Rent", "Utilities", "Office", "Professional", "Insurance", "Interest", "Taxes"]
-             
-             # Create a mini dataframe for the pie chart
-             pie_data = []
-             if 'Category' in forecast_df.columns:
-                 for _, row in forecast_df.iterrows():
-                     cat = str(row['Category'])
-                     if any(k.lower() in cat.lower() for k in expense_keys):
-                         val = float(row[last_year]) if last_year in forecast_df.columns else 0
-                         if val > 0:
-                             pie_data.append({"Category": cat, "Amount": val})
-             
-             df_pie = pd.DataFrame(pie_data)
-             if not df_pie.empty:
-                 fig_pie = px.pie(df_pie, values="Amount", names="Category", hole=0.4)
-                 fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+             fig_pie = build_expense_pie(forecast_df, last_year)
+             if fig_pie is not None:
                  st.plotly_chart(fig_pie, use_container_width=True)
              else:
                  st.info("No detailed expense data found for breakdown.")
@@ -285,33 +411,7 @@ if st.session_state.data_source is not None:
         st.subheader(f"Profitability Waterfall ({start_year})")
         
         try:
-            val_sales = exec_summary_df.loc["Net Sales", str(start_year)]
-            val_cogs = -abs(exec_summary_df.loc["Direct Cost", str(start_year)]) # COGS is a reduction
-            val_opex = -abs(exec_summary_df.loc["Operating Expenses", str(start_year)])
-            val_tax_int = -abs(exec_summary_df.loc["Interest", str(start_year)] + exec_summary_df.loc["Taxes", str(start_year)])
-            val_net = exec_summary_df.loc["EBIT (Earnings before Interest and Taxes)", str(start_year)] # Approx
-            # Actually, let's do: Sales -> COGS -> Gross Profit -> Opex -> EBIT
-            
-            fig_waterfall = go.Figure(go.Waterfall(
-                name = "20", orientation = "v",
-                measure = ["relative", "relative", "total", "relative", "total"],
-                x = ["Net Sales", "Direct Cost", "Gross Margin", "Opex", "EBIT"],
-                textposition = "outside",
-                text = [f"{val_sales/1000:.1f}k", f"{val_cogs/1000:.1f}k", f"{val_sales+val_cogs:.1f}", f"{val_opex/1000:.1f}k", f"{(val_sales+val_cogs+val_opex)/1000:.1f}k"],
-                y = [val_sales, val_cogs, 0, val_opex, 0],
-                connector = {"line":{"color":"rgb(63, 63, 63)"}},
-            ))
-            # The 'total' measure computes automatically based on previous values? No, Waterfall is tricky.
-            # Simpler setup:
-            fig_waterfall = go.Figure(go.Waterfall(
-                orientation = "v",
-                measure = ["absolute", "relative", "total", "relative", "relative", "total"],
-                x = ["Net Sales", "Direct Cost", "Gross Margin", "Opex", "Interest/Tax", "Net Result"],
-                y = [val_sales, val_cogs, 0, val_opex, val_tax_int, 0],
-                connector = {"line":{"color":"rgb(63, 63, 63)"}},
-            ))
-            
-            fig_waterfall.update_layout(title = "Profit Flow Waterfall", showlegend = True)
+            fig_waterfall = build_waterfall_chart(exec_summary_df, str(start_year))
             st.plotly_chart(fig_waterfall, use_container_width=True)
         except Exception as e:
             st.error(f"Could not generate Waterfall: {e}")
@@ -347,12 +447,9 @@ if st.session_state.data_source is not None:
             response = "I need an API Key to answer intelligently!"
             if api_key or llm_provider == "Local (Ollama)":
                 try:
-                    from langchain_core.messages import HumanMessage, SystemMessage
-                    from langchain_core.prompts import ChatPromptTemplate
-                    
                     # Construct Context
                     # Convert dataframe to string/markdown for context
-                    context_data = forecast_df.to_markdown()
+                    context_data = forecast_context(forecast_df)
                     system_prompt = f"""
                     You are a highly skilled financial analyst assistant (CFO level).
                     
@@ -371,45 +468,22 @@ if st.session_state.data_source is not None:
                     3. If the data contains forecasts (future years), explicitly mention they are projections.
                     """
                     
-                    # Call LLM
-                    if llm_provider == "OpenAI":
-                        from langchain_openai import ChatOpenAI
-                        llm = ChatOpenAI(model=openai_model, api_key=api_key)
-                        res = llm.invoke([SystemMessage(content=system_prompt), HumanMessage(content=user_input)])
-                        response = res.content
-                    elif llm_provider == "Local (Ollama)":
-                         from langchain_ollama import ChatOllama
-                         try:
-                             llm = ChatOllama(model=ollama_model) 
-                             res = llm.invoke([SystemMessage(content=system_prompt), HumanMessage(content=user_input)])
-                             response = res.content
-                         except Exception as ol_err:
-                             if "No connection made" in str(ol_err) or "10061" in str(ol_err):
-                                 response = "⚠️ **Ollama is not running.**\nPlease download it from [ollama.com](https://ollama.com) and run `ollama serve` in a terminal, or switch to OpenAI/Gemini in the sidebar."
-                             else:
-                                 raise ol_err
-                    elif llm_provider == "Google Gemini":
-                         from langchain_google_genai import ChatGoogleGenerativeAI
-                         # API Key should be set in os.environ["GOOGLE_API_KEY"] usually, 
-                         # but we can pass it if the library supports it or set env var earlier.
-                         os.environ["GOOGLE_API_KEY"] = api_key
-                         # Using standard model name. Ensure langchain-google-genai is updated.
-                         llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=api_key)
-                         res = llm.invoke([SystemMessage(content=system_prompt), HumanMessage(content=user_input)])
-                         response = res.content
-                    elif llm_provider == "OpenRouter":
-                        from langchain_openai import ChatOpenAI
-                        llm = ChatOpenAI(
-                            base_url="https://openrouter.ai/api/v1",
-                            api_key=api_key,
-                            model=openrouter_model,
-                            default_headers={
-                                "HTTP-Referer": "http://localhost:8501", 
-                                "X-Title": "Financial Chatbot POC"
-                            }
-                        )
+                    # Call LLM (client is built once per provider/key/model, see get_llm)
+                    model_name = {
+                        "OpenAI": openai_model,
+                        "Google Gemini": "gemini-1.5-flash",
+                        "OpenRouter": openrouter_model,
+                        "Local (Ollama)": ollama_model
+                    }[llm_provider]
+                    llm = get_llm(llm_provider, api_key, model_name)
+                    try:
                         res = llm.invoke([SystemMessage(content=system_prompt), HumanMessage(content=user_input)])
                         response = res.content
+                    except Exception as llm_err:
+                        if llm_provider == "Local (Ollama)" and ("No connection made" in str(llm_err) or "10061" in str(llm_err)):
+                            response = "⚠️ **Ollama is not running.**\nPlease download it from [ollama.com](https://ollama.com) and run `ollama serve` in a terminal, or switch to OpenAI/Gemini in the sidebar."
+                        else:
+                            raise llm_err
                          
                 except Exception as e:
                     response = f"AI Error: {str(e)}"
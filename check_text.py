@@ -1,5 +1,4 @@
-
-import pandas as pd
+from openpyxl import load_workbook
 import os
 
 file_path = "5 Years Profit and Loss_WithTrend.xlsx"
@@ -7,16 +6,20 @@ file_path = "5 Years Profit and Loss_WithTrend.xlsx"
 if os.path.exists(file_path):
     print(f"Scanning {file_path} for text blocks...")
     try:
-        df = pd.read_excel(file_path, sheet_name=None, header=None) # Read all sheets
-        for sheet_name, sheet_df in df.items():
-            print(f"--- Sheet: {sheet_name} ---")
-            # Iterate through all cells
-            for idx, row in sheet_df.iterrows():
-                for col_idx, value in enumerate(row):
-                    if isinstance(value, str) and len(value) > 100:
-                        print(f"Found large text at Row {idx}, Col {col_idx}:")
-                        print(f"Content: {value[:200]}...")
-                        print("-" * 20)
+        # Stream every sheet in read-only mode instead of decoding them all into DataFrames
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                print(f"--- Sheet: {ws.title} ---")
+                # Iterate through all cells, one row of values at a time
+                for idx, row in enumerate(ws.iter_rows(values_only=True)):
+                    for col_idx, value in enumerate(row):
+                        if isinstance(value, str) and len(value) > 100:
+                            print(f"Found large text at Row {idx}, Col {col_idx}:")
+                            print(f"Content: {value[:200]}...")
+                            print("-" * 20)
+        finally:
+            wb.close()
     except Exception as e:
         print(f"Error: {e}")
 else:
@@ -1,28 +1,62 @@
 
+import re
 import pandas as pd
 import numpy as np
 
-def generate_forecast(df_input, start_year, end_year):
+# Expense rows summed by calculate_summary_metrics
+EXPENSE_KEYS = (
+    "Marketing", "Salaries", "Payroll", "Travel", "Hosting", "Stationary", 
+    "Rent", "Utilities", "Office", "Professional", "Insurance", 
+    "Depreciation", "Interest", "Other Operating"
+)
+# Operating expense rows for the executive summary (Interest and Tax excluded)
+OPEX_KEYS = (
+    "Marketing", "Salaries", "Payroll", "Travel", "Hosting", "Stationary", 
+    "Rent", "Utilities", "Office", "Professional", "Insurance", 
+    "Depreciation", "Other Operating", "Amortization", "Bad Debt"
+)
+
+def _keys_pattern(keys):
+    return re.compile("|".join(re.escape(k.lower()) for k in keys))
+
+EXPENSE_PATTERN = _keys_pattern(EXPENSE_KEYS)
+OPEX_PATTERN = _keys_pattern(OPEX_KEYS)
+
+def _extend_trend(val_prev, val_last, n_years):
+    """
+    Projects n_years forward for every row at once: each new year is the previous
+    year plus the latest year-on-year change. Returns a (rows, n_years) float array.
+    """
+    # Simple Linear Trend: repeating the same diff every year is an arithmetic
+    # progression, so year k ahead is val_last + k * diff (one broadcast)
+    diff = val_last - val_prev
+    steps = np.arange(1, n_years + 1)
+    return val_last[:, None] + steps[None, :] * diff[:, None]
+
+def generate_forecast(df_input, start_year, end_year, copy=True):
     """
     Takes a dataframe with 'Category' and Year columns.
     Dynamically identifies the latest available data years and forecasts
     up to end_year based on the trend of the last 2 available years.
+    Callers that don't reuse df_input can pass copy=False to skip the upfront
+    copy; its year columns are then coerced in place.
     """
     # Create a copy to avoid mutating original
-    df = df_input.copy()
+    df = df_input.copy() if copy else df_input
     
     # Identify existing years in columns (assuming integer-like column names)
-    existing_years = []
-    for col in df.columns:
-        if str(col).isdigit():
-            existing_years.append(int(col))
-    
-    existing_years.sort()
+    existing_years = sorted(int(col) for col in df.columns if str(col).isdigit())
+    year_cols = [str(y) for y in existing_years]
     
-    # Ensure numeric for updated columns
-    for y in existing_years:
-        col_name = str(y)
-        df[col_name] = pd.to_numeric(df[col_name], errors='coerce').fillna(0)
+    # Ensure numeric for updated columns, all in one pass
+    # (one float64 dtype for every year column, matching the forecast columns,
+    # instead of a mix of int/Arrow/float; float32 would lose cents)
+    if year_cols:
+        # Only text columns need parsing; numeric ones (ints, Arrow doubles) just get cast
+        text_cols = [c for c in year_cols if not pd.api.types.is_numeric_dtype(df[c])]
+        if text_cols:
+            df[text_cols] = df[text_cols].apply(pd.to_numeric, errors='coerce')
+        df[year_cols] = df[year_cols].fillna(0).astype(np.float64)
     
     # We need at least 2 years to calculate a trend
     if len(existing_years) < 2:
@@ -40,116 +74,117 @@ def generate_forecast(df_input, start_year, end_year):
     base_year_last = str(existing_years[-1])
     base_year_prev = str(existing_years[-2])
     
-    for year in years_to_predict:
-        # We use a moving trend or fixed trend? 
-        # User implies linear projection.
-        # Let's use the trend from the *Most Recent Actuals* and apply it forward?
-        # Or should we propagate the trend (i.e. if 2026 is predicted, use 2026-2025 for 2027?)
-        # Simple linear projection from last actuals is often safer (Constant Growth)
-        # But if we want "Compound" growth, we use previous year.
-        # Let's stick to the previous logic: New Year = Previous Year + Diff.
-        # But Diff should be calculated from the BASE or dynamically?
-        # Original code: diff = row[prev_year] - row[prev_prev_year]
-        # This implies "Momentum". If 2025 grew by 100 vs 2024, then 2026 grows by 100 vs 2025.
-        
-        prev_year = str(year - 1)
-        prev_prev_year = str(year - 2)
-        
-        # Calculate for each row
-        new_values = []
-        for _, row in df.iterrows():
-            try:
-                val_last = float(row[prev_year])
-                val_prev = float(row[prev_prev_year])
-                
-                # Simple Linear Trend
-                diff = val_last - val_prev
-                prediction = val_last + diff
-                new_values.append(prediction)
-            except:
-                new_values.append(0.0)
-        
-        df[str(year)] = new_values
+    # We use a moving trend or fixed trend? 
+    # User implies linear projection.
+    # Let's use the trend from the *Most Recent Actuals* and apply it forward?
+    # Or should we propagate the trend (i.e. if 2026 is predicted, use 2026-2025 for 2027?)
+    # Simple linear projection from last actuals is often safer (Constant Growth)
+    # But if we want "Compound" growth, we use previous year.
+    # Let's stick to the previous logic: New Year = Previous Year + Diff.
+    # But Diff should be calculated from the BASE or dynamically?
+    # Original code: diff = row[prev_year] - row[prev_prev_year]
+    # This implies "Momentum". If 2025 grew by 100 vs 2024, then 2026 grows by 100 vs 2025.
+    val_last = df[base_year_last].to_numpy(dtype=np.float64)
+    prev_year = str(last_actual_year - 1)
+    if prev_year in df.columns:
+        forecast = _extend_trend(df[prev_year].to_numpy(dtype=np.float64), val_last, len(years_to_predict))
+    else:
+        # Gap in the year columns: no trend for the first predicted year,
+        # later years extend from that zero column
+        first = np.zeros(len(df))
+        forecast = np.column_stack([first, _extend_trend(val_last, first, len(years_to_predict) - 1)])
+    
+    # Add all predicted year columns in one step
+    forecast_df = pd.DataFrame(forecast, index=df.index, columns=[str(y) for y in years_to_predict])
+    df = pd.concat([df, forecast_df], axis=1)
 
     return df
 
-def calculate_summary_metrics(df):
+def _keyword_totals(categories, values, keys, pattern):
     """
-    Calculates derived metrics like Gross Profit, Total Expenses, Net Income 
-    if the rows are identifiable.
+    Per-year sum of the rows of values whose (lower-cased) category contains any
+    of keys, a row matching several keys counting once for each of them.
+    One combined regex pass finds the candidate rows; only those are checked
+    key by key.
     """
-    # Normalize categories for matching
-    df['Category_Clean'] = df['Category'].astype(str).str.lower().str.strip()
-    
-    years = [c for c in df.columns if c not in ['Category', 'Category_Clean']]
+    hits = categories.str.contains(pattern, na=False).to_numpy()
+    if not hits.any():
+        return np.zeros(values.shape[1])
+    matched = categories[hits]
+    counts = np.zeros(len(matched))
+    for k in keys:
+        counts += matched.str.contains(k.lower(), na=False).to_numpy()
+    return counts @ values[hits]
+
+def _clean_categories(categories):
+    """
+    Lower-cased, stripped category labels for keyword matching. As a categorical,
+    every keyword scan runs once per distinct label instead of once per row.
+    """
+    # Lower/strip only the distinct labels, then map each row to its cleaned label
+    labels = categories.astype(str).astype('category')
+    codes, cleaned = pd.factorize(labels.cat.categories.str.lower().str.strip())
+    # Missing labels have code -1, which picks the appended -1 (missing) here too
+    codes = np.append(codes, -1)[labels.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=cleaned), index=categories.index)
+
+def _year_columns(df):
+    return [c for c in df.columns if c not in ['Category', 'Category_Clean']]
+
+def _year_matrix(df, years):
+    """The year columns as one float matrix; cells that aren't numbers count as 0."""
+    return df[years].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+def _keyword_matcher(categories):
+    """
+    Returns mask(key): a boolean array of the rows whose category contains key.
+    Each key is scanned once, however many times (and by whichever summary) it
+    is asked for.
+    """
+    masks = {}
+    def mask(key):
+        key = key.lower()
+        if key not in masks:
+            masks[key] = categories.str.contains(key, na=False).to_numpy()
+        return masks[key]
+    return mask
+
+def _summary_metrics(categories, years, values, mask):
+    """Gross Profit, Total Expenses and Net Profit per year (see calculate_summary_metrics)."""
+    # Note: This is a robust guess. In a real app, we'd ID specific rows by ID.
+    # extract specific known keys safely: the first matching row, for every year
+    def get_val(key):
+        # Basic fuzzy matching
+        rows = mask(key)
+        if rows.any():
+            return pd.Series(values[rows.argmax()], index=years)
+        return pd.Series(0.0, index=years)
+
+    g_sales = get_val("Gross Sales")
+    discounts = get_val("Discounts")
+    returns = get_val("Returns")
+    cost_goods = get_val("Cost of Goods Sold")
     
-    summary = {}
+    net_sales = g_sales + discounts + returns
+    g_profit = net_sales - cost_goods
     
-    # Helper to sum based on keyword
-    def sum_by_keyword(keyword, exclude=None):
-        mask = df['Category_Clean'].str.contains(keyword, na=False)
-        if exclude:
-            mask = mask & ~df['Category_Clean'].str.contains(exclude, na=False)
-        return df[mask][years].sum()
+    # Expenses
+    expense_totals = pd.Series(
+        _keyword_totals(categories, values, EXPENSE_KEYS, EXPENSE_PATTERN), index=years
+    )
     
-    # For the POC, we iterate year by year
-    results = pd.DataFrame(index=years, columns=["Gross Profit", "Total Expenses", "Net Profit"])
+    net_profit = g_profit - expense_totals
     
-    for y in years:
-        # Get scalar values for the year
-        # Note: This is a robust guess. In a real app, we'd ID specific rows by ID.
-        col_data = df.set_index('Category')[y]
-        
-        # extract specific known keys safely
-        def get_val(key):
-            try:
-                # Basic fuzzy matching
-                matches = col_data[col_data.index.str.contains(key, case=False, na=False)]
-                if len(matches) > 0:
-                    return float(matches.values[0])
-                else: 
-                     return 0.0
-            except:
-                return 0.0
-
-        g_sales = get_val("Gross Sales")
-        discounts = get_val("Discounts")
-        returns = get_val("Returns")
-        cost_goods = get_val("Cost of Goods Sold")
-        
-        net_sales = g_sales + discounts + returns
-        g_profit = net_sales - cost_goods
-        
-        # Expenses
-        expense_keys = [
-            "Marketing", "Salaries", "Payroll", "Travel", "Hosting", "Stationary", 
-            "Rent", "Utilities", "Office", "Professional", "Insurance", 
-            "Depreciation", "Interest", "Other Operating"
-        ]
-        total_exp = 0
-        for k in expense_keys:
-             total_exp += df[df['Category_Clean'].str.contains(k.lower(), na=False)][y].sum()
-             
-        net_profit = g_profit - total_exp
-        
-        results.loc[y, "Gross Profit"] = g_profit
-        results.loc[y, "Total Expenses"] = total_exp
-        results.loc[y, "Net Profit"] = net_profit
+    # Each metric is already a full series over years: build the table in one go
+    results = pd.DataFrame(
+        {"Gross Profit": g_profit, "Total Expenses": expense_totals, "Net Profit": net_profit},
+        index=years
+    )
         
     return results
 
-def calculate_executive_summary(df):
-    """
-    Generates a high-level summary table matching the requested format:
-    Revenue: Net Sales, Direct Cost, Gross Margin, Gross Margin %
-    Expenses: Operating Expenses, Interest, Taxes, EBIT
-    """
-    df = df.copy()
-    if 'Category_Clean' not in df.columns:
-         df['Category_Clean'] = df['Category'].astype(str).str.lower().str.strip()
-
-    years = [c for c in df.columns if c not in ['Category', 'Category_Clean']]
-    
+def _executive_summary(categories, years, values, mask):
+    """The executive summary table, metrics by year (see calculate_executive_summary)."""
     # Initialize result structure
     # Rows we want
     rows = [
@@ -163,71 +198,101 @@ def calculate_executive_summary(df):
         "EBIT (Earnings before Interest and Taxes)"
     ]
     
-    summary_df = pd.DataFrame(index=rows, columns=years)
+    # Per-year totals for every single-keyword line item in one product:
+    # (line items x rows) match matrix times (rows x years) values.
+    # A key matching no rows gets zeros.
+    line_keys = ["Gross Sales", "Sales Discount", "Sales Returns", "Cost of Goods Sold", "Interest Expense", "Income Tax"]
+    line_totals = dict(zip(line_keys, np.vstack([mask(k) for k in line_keys]) @ values))
     
-    for y in years:
-        col_data = df.set_index('Category')[y]
-        
-        def get_val(key_list):
-            total = 0.0
-            for key in key_list:
-                matches = df[df['Category_Clean'].str.contains(key.lower(), na=False)][y]
-                total += matches.sum()
-            return float(total)
-            
-        def get_val_exact(key_fragment):
-             matches = df[df['Category_Clean'].str.contains(key_fragment.lower(), na=False)][y]
-             return float(matches.sum())
-
-        # 1. Revenue
-        # Net Sales = Gross Sales - Discounts (if neg) - Returns. Assuming they are in the sheet.
-        # Simple Sum of "Gross Sales", "Discounts", "Returns" rows
-        net_sales = get_val_exact("Gross Sales") + get_val_exact("Sales Discount") + get_val_exact("Sales Returns")
-        
-        # Direct Cost = Cost of Goods Sold
-        direct_cost = get_val_exact("Cost of Goods Sold")
-        
-        # Gross Margin
-        gross_margin = net_sales - direct_cost # Assuming COGS is positive. If negative in sheet, add it.
-        # User sheet usually has COGS as positive number to be subtracted. 
-        # But let's check: Net Sales 81k, Direct Cost 6.7k => GM 74.3k. So 81 - 6.7. Correct.
-        
-        if net_sales != 0:
-            gm_percent = (gross_margin / net_sales) * 100
-        else:
-            gm_percent = 0.0
-            
-        # 2. Expenses
-        # Operating Expenses: All expenses EXCEPT Interest and Taxes
-        # We can sum known categories
-        opex_keys = [
-             "Marketing", "Salaries", "Payroll", "Travel", "Hosting", "Stationary", 
-            "Rent", "Utilities", "Office", "Professional", "Insurance", 
-            "Depreciation", "Other Operating", "Amortization", "Bad Debt"
-        ]
-        # Exclude Interest, Tax
-        operating_expenses = get_val(opex_keys)
-        
-        # Interest
-        interest = get_val_exact("Interest Expense")
-        
-        # Taxes
-        taxes = get_val_exact("Income Tax") # or just "Taxes"
-        
-        # EBIT
-        # Formula: Gross Margin - Operating Expenses
-        # Wait, usually EBIT = Net Income + Interest + Taxes? 
-        # Or Revenue - COGS - Opex. Yes.
-        ebit = gross_margin - operating_expenses
+    def get_val_exact(key_fragment):
+        return pd.Series(line_totals[key_fragment], index=years)
+    
+    # 1. Revenue
+    # Net Sales = Gross Sales - Discounts (if neg) - Returns. Assuming they are in the sheet.
+    # Simple Sum of "Gross Sales", "Discounts", "Returns" rows
+    net_sales = get_val_exact("Gross Sales") + get_val_exact("Sales Discount") + get_val_exact("Sales Returns")
+    
+    # Direct Cost = Cost of Goods Sold
+    direct_cost = get_val_exact("Cost of Goods Sold")
+    
+    # Gross Margin
+    gross_margin = net_sales - direct_cost # Assuming COGS is positive. If negative in sheet, add it.
+    # User sheet usually has COGS as positive number to be subtracted. 
+    # But let's check: Net Sales 81k, Direct Cost 6.7k => GM 74.3k. So 81 - 6.7. Correct.
+    
+    # Only divide where there are sales; years without sales stay at 0%
+    ns = net_sales.to_numpy()
+    gm_percent = pd.Series(
+        np.divide(gross_margin.to_numpy(), ns, out=np.zeros(len(years)), where=ns != 0) * 100,
+        index=years
+    )
         
-        # Populate
-        summary_df.loc["Net Sales", y] = net_sales
-        summary_df.loc["Direct Cost", y] = direct_cost
-        summary_df.loc["Gross Margin (Profit)", y] = gross_margin
-        summary_df.loc["Gross Margin %", y] = gm_percent
-        summary_df.loc["Operating Expenses", y] = operating_expenses
-        summary_df.loc["Interest", y] = interest
-        summary_df.loc["Taxes", y] = taxes
-        summary_df.loc["EBIT (Earnings before Interest and Taxes)", y] = ebit
+    # 2. Expenses
+    # Operating Expenses: All expenses EXCEPT Interest and Taxes
+    # We can sum known categories
+    # Exclude Interest, Tax
+    operating_expenses = pd.Series(
+        _keyword_totals(categories, values, OPEX_KEYS, OPEX_PATTERN), index=years
+    )
+    
+    # Interest
+    interest = get_val_exact("Interest Expense")
+    
+    # Taxes
+    taxes = get_val_exact("Income Tax") # or just "Taxes"
+    
+    # EBIT
+    # Formula: Gross Margin - Operating Expenses
+    # Wait, usually EBIT = Net Income + Interest + Taxes? 
+    # Or Revenue - COGS - Opex. Yes.
+    ebit = gross_margin - operating_expenses
+    
+    # One row per metric, each already computed for all years (same year order),
+    # stacked into a single float64 block
+    metrics = [net_sales, direct_cost, gross_margin, gm_percent, operating_expenses, interest, taxes, ebit]
+    summary_df = pd.DataFrame(
+        np.vstack([m.to_numpy(dtype=np.float64) for m in metrics]),
+        index=rows, columns=years
+    )
         
     return summary_df
+
+def _prepare(df):
+    """
+    Matching inputs shared by the summaries: Category_Clean (reused if already
+    on df), the year columns, their float matrix and a keyword matcher.
+    """
+    if 'Category_Clean' in df.columns:
+        categories = df['Category_Clean']
+    else:
+        categories = _clean_categories(df['Category'])
+    years = _year_columns(df)
+    return categories, years, _year_matrix(df, years), _keyword_matcher(categories)
+
+def calculate_summary_metrics(df):
+    """
+    Calculates derived metrics like Gross Profit, Total Expenses, Net Income 
+    if the rows are identifiable.
+    """
+    # Normalize categories for matching (kept on df, so calculate_executive_summary
+    # can reuse it when given the same frame)
+    df['Category_Clean'] = _clean_categories(df['Category'])
+    return _summary_metrics(*_prepare(df))
+
+def calculate_executive_summary(df):
+    """
+    Generates a high-level summary table matching the requested format:
+    Revenue: Net Sales, Direct Cost, Gross Margin, Gross Margin %
+    Expenses: Operating Expenses, Interest, Taxes, EBIT
+    df itself is left untouched.
+    """
+    return _executive_summary(*_prepare(df))
+
+def compute_all_summaries(df):
+    """
+    Both summary tables, (summary metrics, executive summary), from one pass of
+    category normalization, year-matrix conversion and keyword scans.
+    Unlike calculate_summary_metrics, df is left untouched.
+    """
+    prepared = _prepare(df)
+    return _summary_metrics(*prepared), _executive_summary(*prepared)